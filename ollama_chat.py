@@ -44,7 +44,7 @@ class BaseChatbot:
 
     async def cleanup(self) -> None:
         """Clean up any resources used by the chatbot"""
-        self.memory = ConversationBufferMemory(return_messages=True)
+        self.memory.clear()
 
     def get_history(self) -> List[BaseMessage]:
         """Get the conversation history"""
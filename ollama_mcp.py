@@ -1,38 +1,97 @@
-import json
-from praisonaiagents import Agent, MCP
+import asyncio
+import functools
+import logging
+import os
+import shlex
+import threading
+import weakref
+import orjson
+
+logger = logging.getLogger(__name__)
 
 LLM = "ollama/llama3.2"
+CONFIG_PATH = 'mpc_servers.json'
+
+# One MCP instance per unique server command line, shared by every agent that needs it.
+# Entries disappear once no agent holds the instance any more.
+_mcp_instances = weakref.WeakValueDictionary()
+_mcp_locks = {}
+_mcp_locks_guard = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _read_mcp_config(mtime):
+    # mtime is only the cache key, so the file is re-parsed only after it changes
+    with open(CONFIG_PATH, 'rb') as f:
+        config = orjson.loads(f.read())
+    # Drop inactive servers once here so callers never have to check
+    config['mcpServers'] = {
+        server_name: server_config
+        for server_name, server_config in config['mcpServers'].items()
+        if server_config.get('active', False)
+    }
+    _mcp_cmd_for.cache_clear()
+    return config
 
 def load_mcp_config():
-    with open('mpc_servers.json', 'r') as f:
-        return json.load(f)
+    return _read_mcp_config(os.path.getmtime(CONFIG_PATH))
+
+@functools.cache
+def _mcp_cmd_for(server_name):
+    """Build the key identifying a configured server's command line"""
+    server_config = load_mcp_config()['mcpServers'][server_name]
+    return shlex.join([server_config['command'], *server_config['args']])
+
+def get_mcp(server_name):
+    """Return the shared MCP instance for a server's command, starting it on first use"""
+    from praisonaiagents import MCP
+
+    mcp_key = _mcp_cmd_for(server_name)
+
+    # Agents are built on worker threads, so guard against starting a command twice
+    # while still letting different commands start in parallel
+    with _mcp_locks_guard:
+        lock = _mcp_locks.setdefault(mcp_key, threading.Lock())
+    with lock:
+        mcp = _mcp_instances.get(mcp_key)
+        if mcp is None:
+            server_config = load_mcp_config()['mcpServers'][server_name]
+            # Pass the arguments as a list so MCP never has to re-split a string
+            mcp = MCP(server_config['command'], server_config['args'])
+            _mcp_instances[mcp_key] = mcp
+    return mcp
+
+def _build_agent(server_name, server_config):
+    """Start the server's MCP process and create its agent (blocking)"""
+    from praisonaiagents import Agent
+
+    return Agent(
+        instructions=server_config['instructions'],
+        llm=LLM,
+        tools=get_mcp(server_name),
+        verbose=True 
+    )
+
+async def create_agents():
+    servers = load_mcp_config()['mcpServers']
+
+    # Start all servers concurrently; MCP startup blocks, so each runs in a thread
+    results = await asyncio.gather(
+        *[asyncio.to_thread(_build_agent, name, cfg) for name, cfg in servers.items()],
+        return_exceptions=True
+    )
 
-def create_agents():
-    config = load_mcp_config()
     agents = {}
-    
-    for server_name, server_config in config['mcpServers'].items():
-        if not server_config.get('active', False):
+    for server_name, result in zip(servers, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to start MCP server '{server_name}': {result}")
             continue
-            
-        # Construct MCP command
-        mcp_command = [server_config['command']]
-        mcp_command.extend(server_config['args'])
-        mcp_command = " ".join(mcp_command)
-        
-        # Create agent with configuration
-        agents[server_name] = Agent(
-            instructions=server_config['instructions'],
-            llm=LLM,
-            tools=MCP(mcp_command),
-            verbose=True 
-        )
+        agents[server_name] = result
     
     return agents
 
 if __name__ == "__main__":
     # Create all configured agents
-    agents = create_agents()
+    agents = asyncio.run(create_agents())
     
     # Example usage of the Airbnb agent
     if 'airbnb' in agents:
@@ -3,7 +3,9 @@
 import asyncio
 import os
 import logging
-from typing import Optional, List, Any, Dict, Generator
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Optional, List, Any, Dict, Deque, Generator, AsyncIterator
 from langchain_core.messages import (
     AIMessage,
     HumanMessage,
@@ -11,14 +13,14 @@ from langchain_core.messages import (
     BaseMessage,
     ToolMessage
 )
-from langchain_ollama import ChatOllama
-from langchain.memory import ConversationBufferMemory
 from dotenv import load_dotenv
 
 from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from langchain_mcp_adapters.tools import load_mcp_tools
-from langgraph.prebuilt import create_react_agent
+
+# The Ollama model, MCP adapters and LangGraph agent are imported in
+# connect()/initialize() so importing this module stays cheap
+if TYPE_CHECKING:
+    from langchain_ollama import ChatOllama
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,6 +28,9 @@ app_logger = logging.getLogger(__name__)
 
 load_dotenv()  # load environment variables from .env
 
+# Display labels for history messages, looked up by exact message type
+_ROLE_MAP = {SystemMessage: "System", HumanMessage: "Human", AIMessage: "AI"}
+
 class BaseChatbot:
     """Base class for chatbot implementations"""
 
@@ -34,11 +39,17 @@ class BaseChatbot:
         model_name: str = "llama3.2",
         system_message: Optional[str] = None,
         verbose: bool = False,
+        max_turns: int = 20,
     ):
         self.model_name = model_name
         self.system_message = system_message
         self.verbose = verbose
-        self.memory = ConversationBufferMemory(return_messages=True)
+        self.max_turns = max_turns
+        # One list of messages per turn (a HumanMessage and everything the agent
+        # produced for it), bounded so old turns are evicted whole. The system
+        # prompt is kept outside the buffer so it is never evicted.
+        self.turns: Deque[List[BaseMessage]] = deque(maxlen=max_turns)
+        self._system_prompt = SystemMessage(content=system_message) if system_message else None
 
     async def initialize(self) -> None:
         """Initialize the chatbot - to be implemented by subclasses"""
@@ -50,16 +61,25 @@ class BaseChatbot:
 
     async def cleanup(self) -> None:
         """Clean up any resources used by the chatbot"""
-        self.memory = ConversationBufferMemory(return_messages=True)
+        self.turns.clear()
+
+    def add_message(self, message: BaseMessage) -> None:
+        """Add a message to history; a HumanMessage starts a new turn"""
+        if isinstance(message, HumanMessage) or not self.turns:
+            self.turns.append([message])
+        else:
+            self.turns[-1].append(message)
 
     def get_history(self) -> List[BaseMessage]:
         """Get the conversation history"""
-        memory_variables = self.memory.load_memory_variables({})
-        return memory_variables.get("history", [])
+        history = [message for turn in self.turns for message in turn]
+        if self._system_prompt:
+            history.insert(0, self._system_prompt)
+        return history
 
     def clear_history(self) -> None:
         """Clear the conversation history"""
-        self.memory.clear()
+        self.turns.clear()
 
 class OllamaMCPChatbot(BaseChatbot):
     """Chatbot implementation using Ollama with MCP tools integration"""
@@ -74,27 +94,88 @@ class OllamaMCPChatbot(BaseChatbot):
         mcp_server_command: str = "uvx",
         mcp_server_args: List[str] = ["mcp-server-calculator"],
         verbose: bool = False,
+        max_turns: int = 20,
+        batch_window_ms: Optional[int] = None,
     ):
-        super().__init__(model_name, system_message, verbose)
+        super().__init__(model_name, system_message, verbose, max_turns)
         self.base_url = base_url or os.getenv("OLLAMA_HOST", "http://localhost:11434")
         self.temperature = temperature
         self.top_p = top_p
-        self.chat_model = None
+        self.chat_model: Optional["ChatOllama"] = None
         self.mcp_server_command = mcp_server_command
         self.mcp_server_args = mcp_server_args
         self.mcp_server_params = StdioServerParameters(
             command=mcp_server_command,
             args=mcp_server_args,
         )
+        self.mcp_exit_stack = None
         self.mcp_session = None
         self.mcp_read = None
         self.mcp_write = None
         self.mcp_tools = None
+        self._tools_cache: Optional[List[Dict]] = None
         self.agent = None
         self.ready = False
+        # When set, chat() collects messages for this many ms and sends them as one batch
+        self.batch_window_ms = batch_window_ms
+        self._batch_queue = None
+        self._batch_task = None
+        self._batch_pending = []
+        self._init_lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        """Open the MCP stdio session, reusing it if it is already connected"""
+        if self.mcp_session is not None:
+            return
+
+        from mcp.client.stdio import stdio_client
+
+        if self.verbose:
+            app_logger.info("Initializing MCP connection")
+
+        # The exit stack keeps the client and session alive across chat() calls
+        # and unwinds them in reverse order on disconnect()
+        exit_stack = AsyncExitStack()
+        try:
+            self.mcp_read, self.mcp_write = await exit_stack.enter_async_context(
+                stdio_client(self.mcp_server_params)
+            )
+            session = await exit_stack.enter_async_context(
+                ClientSession(self.mcp_read, self.mcp_write)
+            )
+            await session.initialize()
+        except Exception:
+            await exit_stack.aclose()
+            self.mcp_read = None
+            self.mcp_write = None
+            raise
+
+        self.mcp_exit_stack = exit_stack
+        self.mcp_session = session
+
+    async def disconnect(self) -> None:
+        """Close the MCP session and stop the server subprocess"""
+        if self.mcp_exit_stack is not None:
+            try:
+                await self.mcp_exit_stack.aclose()
+            except Exception as e:
+                app_logger.error(f"Error cleaning up MCP session: {str(e)}")
+
+        self.mcp_exit_stack = None
+        self.mcp_session = None
+        self.mcp_read = None
+        self.mcp_write = None
+
+    def reset(self) -> None:
+        """Drop the conversation memory but keep the MCP session alive"""
+        self.clear_history()
 
     async def initialize(self) -> None:
         try:
+            from langchain_ollama import ChatOllama
+            from langchain_mcp_adapters.tools import load_mcp_tools
+            from langgraph.prebuilt import create_react_agent
+
             # Initialize Ollama model
             self.chat_model = ChatOllama(
                 model=self.model_name,
@@ -106,18 +187,8 @@ class OllamaMCPChatbot(BaseChatbot):
             if self.verbose:
                 app_logger.info(f"Initializing Ollama with model: {self.model_name}")
 
-            # Initialize MCP connection
-            if self.verbose:
-                app_logger.info(f"Initializing MCP connection")
-            
-            # We need to use client and session as part of instance variables for persistence
-            self.mcp_client = stdio_client(self.mcp_server_params)
-            self.mcp_read, self.mcp_write = await self.mcp_client.__aenter__()
-            self.mcp_session = ClientSession(self.mcp_read, self.mcp_write)
-            await self.mcp_session.__aenter__()
-            
-            # Initialize the MCP connection
-            await self.mcp_session.initialize()
+            # Initialize MCP connection (kept open for the lifetime of the chatbot)
+            await self.connect()
             
             # Get tools
             self.mcp_tools = await load_mcp_tools(self.mcp_session)
@@ -127,20 +198,29 @@ class OllamaMCPChatbot(BaseChatbot):
                 for tool in self.mcp_tools:
                     app_logger.info(f"- {tool.name}: {tool.description}")
             
+            self._tools_cache = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": getattr(tool, "args_schema", None)
+                }
+                for tool in self.mcp_tools
+            ]
+            
             # Create agent with tools
             self.agent = create_react_agent(self.chat_model, self.mcp_tools)
             
             self.ready = True
 
-            if self.system_message:
-                self.memory.chat_memory.add_message(SystemMessage(content=self.system_message))
-
         except Exception as e:
             app_logger.error(f"Failed to initialize OllamaMCP chatbot: {str(e)}")
             self.ready = False
             raise
 
     async def chat(self, message: str) -> str:
+        if self.batch_window_ms:
+            return await self._chat_batched(message)
+
         if not self.ready:
             await self.initialize()
 
@@ -148,7 +228,7 @@ class OllamaMCPChatbot(BaseChatbot):
             return "Chatbot is not ready. Please check the logs and try again."
 
         history = self.get_history()
-        self.memory.chat_memory.add_message(HumanMessage(content=message))
+        self.add_message(HumanMessage(content=message))
 
         try:
             # Format messages for the agent
@@ -157,55 +237,205 @@ class OllamaMCPChatbot(BaseChatbot):
             # Invoke agent
             agent_response = await self.agent.ainvoke(messages_dict)
             
-            # Process and extract the response
-            response_content = ""
-            for message in agent_response.get("messages", []):
-                if isinstance(message, AIMessage) and message.content:
-                    response_content = message.content
-                    self.memory.chat_memory.add_message(AIMessage(content=response_content))
-                elif isinstance(message, ToolMessage) and message.content:
-                    # For tool messages, we add them to history but don't consider them the final response
-                    self.memory.chat_memory.add_message(message)
-            
-            return response_content
+            return self._store_agent_response(agent_response, len(messages_dict["messages"]))
 
         except Exception as e:
             error_msg = f"Error processing message: {str(e)}"
             app_logger.error(error_msg)
             return error_msg
 
+    async def chat_stream(self, message: str) -> AsyncIterator[Optional[str]]:
+        """Process a chat message and stream the response tokens"""
+        if not self.ready:
+            await self.initialize()
+
+        if not self.ready:
+            yield "Chatbot is not ready. Please check the logs and try again."
+            return
+
+        history = self.get_history()
+        self.add_message(HumanMessage(content=message))
+
+        try:
+            # Format messages for the agent
+            messages_dict = {"messages": history + [HumanMessage(content=message)]}
+
+            response_content = ""
+            streamed_any = False
+            new_step = False
+            final_state = None
+            async for event in self.agent.astream_events(messages_dict, version="v2"):
+                if event["event"] == "on_chat_model_start":
+                    # Each model step (e.g. before and after a tool call) is its own reply
+                    response_content = ""
+                    new_step = True
+                elif event["event"] == "on_chat_model_stream":
+                    content = event["data"]["chunk"].content
+                    if content:
+                        if new_step and streamed_any:
+                            # Keep text from an earlier step apart from this one
+                            yield "\n\n"
+                        new_step = False
+                        streamed_any = True
+                        response_content += content
+                        yield content
+                elif event["event"] == "on_chain_end" and not event.get("parent_ids"):
+                    # The top-level graph run ends with the full agent state
+                    final_state = event["data"].get("output")
+
+            if isinstance(final_state, dict) and final_state.get("messages"):
+                self._store_agent_response(final_state, len(messages_dict["messages"]))
+            elif response_content:
+                self.add_message(AIMessage(content=response_content))
+            yield None
+
+        except Exception as e:
+            error_msg = f"Error processing streaming message: {str(e)}"
+            app_logger.error(error_msg)
+            yield error_msg
+            yield None
+
+    async def chat_batch(self, messages: List[str]) -> List[str]:
+        """Send several messages concurrently so Ollama can batch them together.
+
+        Every message sees the same history; the exchanges are stored in order.
+        """
+        if not self.ready:
+            await self.initialize()
+
+        if not self.ready:
+            return ["Chatbot is not ready. Please check the logs and try again."] * len(messages)
+
+        history = self.get_history()
+        payloads = [
+            {"messages": history + [HumanMessage(content=message)]}
+            for message in messages
+        ]
+        agent_responses = await asyncio.gather(
+            *[self.agent.ainvoke(payload) for payload in payloads],
+            return_exceptions=True,
+        )
+
+        responses = []
+        for message, payload, agent_response in zip(messages, payloads, agent_responses):
+            self.add_message(HumanMessage(content=message))
+            if isinstance(agent_response, Exception):
+                error_msg = f"Error processing message: {str(agent_response)}"
+                app_logger.error(error_msg)
+                responses.append(error_msg)
+            else:
+                responses.append(self._store_agent_response(agent_response, len(payload["messages"])))
+
+        return responses
+
+    def _store_agent_response(self, agent_response: Dict[str, Any], start: int = 0) -> str:
+        """Add the agent's new messages to memory and return the final AI response.
+
+        ``start`` is the number of input messages echoed back at the head of the
+        agent state, which are already in memory.
+        """
+        new_messages = agent_response["messages"][start:]
+        # Local bindings skip repeated global/attribute lookups in the loops below
+        ai_message, tool_message = AIMessage, ToolMessage
+        add = self.add_message
+
+        response_content = next(
+            (m.content for m in reversed(new_messages) if isinstance(m, ai_message) and m.content),
+            "",
+        )
+
+        for message in new_messages:
+            if isinstance(message, ai_message) and message.content:
+                add(ai_message(content=message.content))
+            elif isinstance(message, tool_message) and message.content:
+                # For tool messages, we add them to history but don't consider them the final response
+                add(message)
+        
+        return response_content
+
+    async def _chat_batched(self, message: str) -> str:
+        """Queue a message for the next batch and wait for its response"""
+        # Initialize in the caller's task, not the flush task: the MCP session's
+        # exit stack must be unwound from the task that entered it
+        if not self.ready:
+            async with self._init_lock:
+                if not self.ready:
+                    await self.initialize()
+
+        if not self.ready:
+            return "Chatbot is not ready. Please check the logs and try again."
+
+        if self._batch_queue is None:
+            self._batch_queue = asyncio.Queue()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((message, future))
+
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._flush_batches())
+
+        return await future
+
+    async def _flush_batches(self) -> None:
+        """Send queued messages through chat_batch() once per batch window"""
+        while not self._batch_queue.empty():
+            await asyncio.sleep(self.batch_window_ms / 1000)
+
+            # Kept on the instance so cleanup() can cancel a batch that is in flight
+            self._batch_pending = pending = []
+            while not self._batch_queue.empty():
+                pending.append(self._batch_queue.get_nowait())
+
+            try:
+                responses = await self.chat_batch([message for message, _ in pending])
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self._batch_pending = []
+
+            for (_, future), response in zip(pending, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    def _cancel_batches(self) -> None:
+        """Stop batching and cancel every chat() call still waiting on a batch"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+
+        waiting = list(self._batch_pending)
+        if self._batch_queue is not None:
+            while not self._batch_queue.empty():
+                waiting.append(self._batch_queue.get_nowait())
+
+        for _, future in waiting:
+            if not future.done():
+                future.cancel()
+
+        self._batch_pending = []
+        self._batch_queue = None
+
     async def cleanup(self) -> None:
         await super().cleanup()
+
+        self._cancel_batches()
         
         # Clean up MCP resources
-        if self.mcp_session:
-            try:
-                await self.mcp_session.__aexit__(None, None, None)
-                await self.mcp_client.__aexit__(None, None, None)
-            except Exception as e:
-                app_logger.error(f"Error cleaning up MCP session: {str(e)}")
+        await self.disconnect()
         
         self.chat_model = None
-        self.mcp_session = None
-        self.mcp_read = None
-        self.mcp_write = None
         self.mcp_tools = None
+        self._tools_cache = None
         self.agent = None
         self.ready = False
 
     def get_available_tools(self) -> List[Dict]:
         """Get information about available MCP tools"""
-        if not self.mcp_tools:
-            return []
-        
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": getattr(tool, "args_schema", None)
-            }
-            for tool in self.mcp_tools
-        ]
+        # Copies, so callers can't modify the cached descriptors
+        return [dict(tool) for tool in self._tools_cache or []]
 
 async def main():
     # Initialize the chatbot with MCP tools
@@ -225,31 +455,22 @@ async def main():
         for tool in tools:
             print(f"- {tool['name']}: {tool['description']}")
         
-        # Example calculation using MCP tools
-        print("\n=== Calculation Query Example ===")
-        response = await chatbot.chat("what's (3 + 5) x 12?")
-        print(f"Bot: {response}")
-        
-        # Example of another query
-        print("\n=== Another Query Example ===")
-        response = await chatbot.chat("Can you calculate 25 * 4 + 7?")
-        print(f"Bot: {response}")
+        # Example calculations using MCP tools, sent together so Ollama can batch them
+        print("\n=== Batched Calculation Query Example ===")
+        queries = ["what's (3 + 5) x 12?", "Can you calculate 25 * 4 + 7?"]
+        responses = await chatbot.chat_batch(queries)
+        for query, response in zip(queries, responses):
+            print(f"You: {query}")
+            print(f"Bot: {response}")
         
         # Example of getting chat history
         print("\n=== Chat History ===")
         history = chatbot.get_history()
         for message in history:
-            if isinstance(message, SystemMessage):
-                role = "System"
-            elif isinstance(message, HumanMessage):
-                role = "Human"
-            elif isinstance(message, AIMessage):
-                role = "AI"
-            elif isinstance(message, ToolMessage):
-                role = f"Tool({message.tool_call_id})"
-            else:
-                role = message.__class__.__name__
-            
+            role = _ROLE_MAP.get(type(message)) or (
+                f"Tool({message.tool_call_id})" if isinstance(message, ToolMessage)
+                else message.__class__.__name__
+            )
             print(f"{role}: {message.content}")
     
     finally:
@@ -1,139 +1,209 @@
+import asyncio
+import contextlib
+import math
+import operator
+import os
+import time
+import httpx
 import ollama
-import yfinance as yf
 import requests
-from typing import Dict, Any, Callable
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Callable, List, Optional
 
+STOCK_PRICE_TTL = 15  # seconds a cached stock price stays fresh
+STOCK_PRICE_CACHE_SIZE = 512
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+ARITHMETIC_OPERATIONS = {
+    'add': operator.add,
+    '+': operator.add,
+    'subtract': operator.sub,
+    '-': operator.sub,
+}
+
+STOCK_PRICE_TOOL = {
+    'type': 'function',
+    'function': {
+        'name': 'get_stock_price',
+        'description': 'Get the current stock price for any symbol',
+        'parameters': {
+            'type': 'object',
+            'required': ['symbol'],
+            'properties': {
+                'symbol': {'type': 'string', 'description': 'The stock symbol (e.g., AAPL, GOOGL)'},
+            },
+        },
+    },
+}
+
+ARITHMETIC_TOOL = {
+    'type': 'function',
+    'function': {
+        'name': 'arithmetic',
+        'description': 'Perform basic arithmetic operations',
+        'parameters': {
+            'type': 'object',
+            'required': ['operation', 'a', 'b'],
+            'properties': {
+                'operation': {'type': 'string', 'enum': list(ARITHMETIC_OPERATIONS)},
+                'a': {'type': 'integer'},
+                'b': {'type': 'integer'},
+            },
+        },
+    },
+}
+
+REQUEST_TOOL = {
+    'type': 'function',
+    'function': {
+        'name': 'request',
+        'description': 'Make a web request to any URL',
+        'parameters': {
+            'type': 'object',
+            'required': ['method', 'url'],
+            'properties': {
+                'method': {'type': 'string', 'enum': ['GET', 'POST', 'PUT', 'DELETE']},
+                'url': {'type': 'string', 'description': 'The URL to request'},
+            },
+        },
+    },
+}
+
+TOOLS = [STOCK_PRICE_TOOL, ARITHMETIC_TOOL, REQUEST_TOOL]
 
 class OllamaToolManager:
-    def __init__(self):
+    def __init__(self, host: Optional[str] = None):
+        self.host = host or os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        self.async_client = ollama.AsyncClient(host=self.host)
+
+        # Pooled HTTP sessions so repeated tool requests reuse open connections
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update(DEFAULT_HEADERS)
+        # Opened for the duration of an async call and closed when the last user exits
+        self._async_session = None
+        self._async_session_users = 0
+
+        # symbol -> (timestamp, price)
+        self._stock_price_cache: Dict[str, tuple] = {}
+
         self.available_functions = {
             'get_stock_price': self.get_stock_price,
             'request': self.request_with_headers,
-            'add_numbers': self.add_numbers,
-            'subtract_numbers': self.subtract_numbers,
             'arithmetic': self.arithmetic
         }
+        # Native async variants used by aprocess_prompt() in place of the sync tools
+        self.async_functions = {
+            'request': self.arequest_with_headers,
+        }
 
-        self.tools = [
-            self._create_stock_price_tool(),
-            self._create_arithmetic_tools(),
-            self._create_request_tool()
-        ]
+        self.tools = TOOLS
 
     def get_stock_price(self, symbol: str) -> float:
         """Get current stock price for a symbol"""
+        cached = self._stock_price_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < STOCK_PRICE_TTL:
+            return cached[1]
+
+        price = self._fetch_stock_price(symbol)
+
+        if len(self._stock_price_cache) >= STOCK_PRICE_CACHE_SIZE:
+            self._stock_price_cache.clear()
+        self._stock_price_cache[symbol] = (time.monotonic(), price)
+        return price
+
+    def _fetch_stock_price(self, symbol: str) -> float:
+        """Look up a price, trying the cheap fast_info path before ticker.info"""
+        import yfinance as yf
+
         ticker = yf.Ticker(symbol)
+
+        # fast_info can raise or return NaN; either way fall back to ticker.info
+        try:
+            last_price = ticker.fast_info.last_price
+        except Exception:
+            last_price = None
+        if last_price is not None and not math.isnan(last_price):
+            return last_price
+
+        info = ticker.info
         price_attrs = ['regularMarketPrice', 'currentPrice', 'price']
         
         for attr in price_attrs:
-            if attr in ticker.info and ticker.info[attr] is not None:
-                return ticker.info[attr]
-                
-        fast_info = ticker.fast_info
-        if hasattr(fast_info, 'last_price') and fast_info.last_price is not None:
-            return fast_info.last_price
+            if info.get(attr) is not None:
+                return info[attr]
             
         raise Exception("Could not find valid price data")
 
-    def add_numbers(self, a: int, b: int) -> int:
-        """Add two numbers"""
-        return a + b
+    def close(self):
+        """Close the pooled HTTP session"""
+        self._session.close()
+
+    async def aclose(self):
+        """Close both the pooled HTTP session and the async HTTP client"""
+        self.close()
+        if self._async_session is not None:
+            await self._async_session.aclose()
+            self._async_session = None
+            self._async_session_users = 0
+
+    @contextlib.asynccontextmanager
+    async def _async_http(self):
+        """Share one httpx client across nested async calls, closing it afterwards.
+
+        Scoping the client to the call means every asyncio.run() gets its own
+        client and closes it before the loop goes away.
+        """
+        if self._async_session is None:
+            self._async_session = httpx.AsyncClient(headers=DEFAULT_HEADERS, follow_redirects=True)
+        self._async_session_users += 1
+        try:
+            yield self._async_session
+        finally:
+            self._async_session_users -= 1
+            if self._async_session_users == 0 and self._async_session is not None:
+                client, self._async_session = self._async_session, None
+                await client.aclose()
 
-    def subtract_numbers(self, a: int, b: int) -> int:
-        """Subtract two numbers"""
-        return a - b
-    
     def arithmetic(self, operation: str, a, b):
         """Route to the appropriate arithmetic operation"""
-        # Convert string numbers to integers
+        op = ARITHMETIC_OPERATIONS.get(operation) if isinstance(operation, str) else None
+        if op is None:
+            return f"Unknown operation: {operation}"
+
+        # Arguments may arrive as strings from the model
         try:
             if isinstance(a, str):
                 a = int(a)
             if isinstance(b, str):
                 b = int(b)
-                
-            # Handle different operation formats
-            if operation in ["add", "+"]:
-                return self.add_numbers(a, b)
-            elif operation in ["subtract", "-"]:
-                return self.subtract_numbers(a, b)
-            else:
-                return f"Unknown operation: {operation}"
+            return op(a, b)
         except Exception as e:
             return f"Error in arithmetic operation: {str(e)}"
     
     def request_with_headers(self, method: str, url: str, **kwargs):
         """Make a request with appropriate headers"""
-        # Add default headers if not provided
-        if 'headers' not in kwargs:
-            kwargs['headers'] = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-        
-        # Add timeout if not specified
-        if 'timeout' not in kwargs:
-            kwargs['timeout'] = 10
-            
         try:
-            response = requests.request(method, url, **kwargs)
+            response = self._session.request(method, url, timeout=kwargs.pop('timeout', 10), **kwargs)
             response.raise_for_status()
             return f"Successfully retrieved content from {url} (status code: {response.status_code})"
         except requests.exceptions.RequestException as e:
             return f"Error making request: {str(e)}"
 
-    def _create_stock_price_tool(self):
-        """Create tool definition for stock price function"""
-        return {
-            'type': 'function',
-            'function': {
-                'name': 'get_stock_price',
-                'description': 'Get the current stock price for any symbol',
-                'parameters': {
-                    'type': 'object',
-                    'required': ['symbol'],
-                    'properties': {
-                        'symbol': {'type': 'string', 'description': 'The stock symbol (e.g., AAPL, GOOGL)'},
-                    },
-                },
-            },
-        }
-
-    def _create_arithmetic_tools(self):
-        """Create tool definitions for arithmetic functions"""
-        return {
-            'type': 'function',
-            'function': {
-                'name': 'arithmetic',
-                'description': 'Perform basic arithmetic operations',
-                'parameters': {
-                    'type': 'object',
-                    'required': ['operation', 'a', 'b'],
-                    'properties': {
-                        'operation': {'type': 'string', 'enum': ['add', '+', 'subtract', '-']},
-                        'a': {'type': 'integer'},
-                        'b': {'type': 'integer'},
-                    },
-                },
-            },
-        }
-    
-    def _create_request_tool(self):
-        """Create tool definition for web requests"""
-        return {
-            'type': 'function',
-            'function': {
-                'name': 'request',
-                'description': 'Make a web request to any URL',
-                'parameters': {
-                    'type': 'object',
-                    'required': ['method', 'url'],
-                    'properties': {
-                        'method': {'type': 'string', 'enum': ['GET', 'POST', 'PUT', 'DELETE']},
-                        'url': {'type': 'string', 'description': 'The URL to request'},
-                    },
-                },
-            },
-        }
+    async def arequest_with_headers(self, method: str, url: str, **kwargs):
+        """Async variant of request_with_headers sharing one httpx client"""
+        try:
+            async with self._async_http() as client:
+                response = await client.request(method, url, timeout=kwargs.pop('timeout', 10), **kwargs)
+            response.raise_for_status()
+            return f"Successfully retrieved content from {url} (status code: {response.status_code})"
+        except httpx.HTTPError as e:
+            return f"Error making request: {str(e)}"
 
     def process_prompt(self, prompt: str, model: str = 'llama3.2'):
         """Process a user prompt using the Ollama model"""
@@ -157,6 +227,79 @@ class OllamaToolManager:
                     print('Function', tool.function.name, 'not found')
         return None
 
+    async def _call_tool(self, tool):
+        """Run a single tool call, off the event loop if the tool is blocking"""
+        function_to_call = (
+            self.async_functions.get(tool.function.name)
+            or self.available_functions.get(tool.function.name)
+        )
+        if not function_to_call:
+            print('Function', tool.function.name, 'not found')
+            return None
+
+        print('Calling function:', tool.function.name)
+        print('Arguments:', tool.function.arguments)
+        if asyncio.iscoroutinefunction(function_to_call):
+            result = await function_to_call(**tool.function.arguments)
+        else:
+            # Blocking tools (yfinance, requests) run in the default threadpool
+            result = await asyncio.to_thread(function_to_call, **tool.function.arguments)
+        print('Function output:', result)
+        return result
+
+    async def aprocess_prompt(self, prompt: str, model: str = 'llama3.2'):
+        """Process a user prompt asynchronously, running tool calls concurrently.
+
+        Returns the tool output for a single tool call, or a list of outputs
+        when the model requests several tools in one turn.
+        """
+        print('Prompt:', prompt)
+
+        response = await self.async_client.chat(
+            model,
+            messages=[{'role': 'user', 'content': prompt}],
+            tools=self.tools
+        )
+
+        if not response.message.tool_calls:
+            return None
+
+        tool_calls = response.message.tool_calls
+        async with self._async_http():
+            results = await asyncio.gather(
+                *[self._call_tool(tool) for tool in tool_calls],
+                return_exceptions=True
+            )
+
+        # A failing tool reports its error without discarding the other results
+        for i, (tool, result) in enumerate(zip(tool_calls, results)):
+            if isinstance(result, Exception):
+                results[i] = f"Error calling {tool.function.name}: {str(result)}"
+                print(results[i])
+
+        return results[0] if len(results) == 1 else results
+
+    async def process_many(self, prompts: List[str], model: str = 'llama3.2'):
+        """Process several prompts concurrently.
+
+        Ollama only serves these in parallel if OLLAMA_NUM_PARALLEL allows it
+        (and OLLAMA_MAX_LOADED_MODELS when mixing models); otherwise requests queue.
+        A prompt that fails gets an error message in its slot instead of
+        aborting the batch.
+        """
+        async with self._async_http():
+            results = await asyncio.gather(
+                *[self.aprocess_prompt(prompt, model) for prompt in prompts],
+                return_exceptions=True
+            )
+
+        for i, (prompt, result) in enumerate(zip(prompts, results)):
+            if isinstance(result, Exception):
+                results[i] = f"Error processing prompt: {str(result)}"
+                print(f"{results[i]} (prompt: {prompt})")
+
+        return results
+
 
 def main():
     # Example usage
@@ -171,6 +314,8 @@ def main():
     # Web request (using a reliable URL instead of ollama.com)
     tool_manager.process_prompt("get the https://httpbin.org/get webpage?")
 
+    tool_manager.close()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,6 +7,9 @@ from ollama_mcp_adapter import OllamaMCPChatbot
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+# Number of streamed chunks to collect before writing them to the terminal
+STREAM_FLUSH_CHUNKS = 32
+
 async def main():
     # Initialize the chatbot with MCP support
     chatbot = OllamaMCPChatbot(
@@ -60,9 +63,16 @@ async def main():
                 
                 # Handle streaming output
                 print("Bot: ", end="", flush=True)
+                buffer = []
                 async for chunk in chatbot.chat_stream(user_input):
                     if chunk is not None:
-                        print(chunk, end="", flush=True)
+                        buffer.append(chunk)
+                        # Write in batches rather than one flush per token
+                        if len(buffer) >= STREAM_FLUSH_CHUNKS or "\n" in chunk:
+                            sys.stdout.write("".join(buffer))
+                            sys.stdout.flush()
+                            buffer.clear()
+                sys.stdout.write("".join(buffer))
                 print()
                 
             except KeyboardInterrupt: